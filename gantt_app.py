@@ -1,40 +1,23 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date, datetime
+import secrets
+import time
+from datetime import date
 from typing import List, Optional
 
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import streamlit as st
 
 import gspread
 from google.oauth2.service_account import Credentials
 
+from gantt_core import PRIORITY_ORDER, Task, df_to_tasks, make_gantt, tasks_signature, tasks_to_df
 
-PRIORITY_COLORS = {
-    "Niski": "#7aa6ff",
-    "Średni": "#f2c14e",
-    "Wysoki": "#ff7a59",
-    "Krytyczny": "#e63946",
-}
-PRIORITY_ORDER = ["Krytyczny", "Wysoki", "Średni", "Niski"]
 
 SHEET_HEADERS = ["id", "name", "start", "plan_end", "priority", "notes", "done", "done_date"]
 
 
-@dataclass
-class Task:
-    id: str
-    name: str
-    start: str            # ISO YYYY-MM-DD
-    plan_end: str         # ISO YYYY-MM-DD
-    priority: str
-    notes: str = ""
-    done: bool = False
-    done_date: str = ""   # ISO YYYY-MM-DD
-
-
 @st.cache_resource
 def get_gspread_client():
     sa = st.secrets["gcp_service_account"]
@@ -45,6 +28,7 @@ def get_gspread_client():
     return gspread.authorize(creds)
 
 
+@st.cache_resource
 def get_worksheet():
     sheet_id = st.secrets.get("SHEET_ID", "")
     if not sheet_id:
@@ -55,63 +39,129 @@ def get_worksheet():
 
 
 def ensure_header(ws):
-    values = ws.get_all_values()
-    if not values:
-        ws.append_row(SHEET_HEADERS)
-        return
-    if values[0] != SHEET_HEADERS:
+    # Nagłówek poprawiamy zawsze w wierszu 1 — także gdy jest pusty, a poniżej są dane.
+    if ws.row_values(1) != SHEET_HEADERS:
         ws.update("A1", [SHEET_HEADERS])
 
 
-def load_tasks() -> List[Task]:
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_tasks_cached() -> tuple:
     ws = get_worksheet()
     ensure_header(ws)
-    rows = ws.get_all_records()
-    tasks: List[Task] = []
-
-    for r in rows:
-        done_val = r.get("done", False)
-        if isinstance(done_val, str):
-            done_val = done_val.strip().lower() in ["true", "1", "tak", "yes", "y"]
-
-        t = Task(
-            id=str(r.get("id", "")).strip(),
-            name=str(r.get("name", "")).strip(),
-            start=str(r.get("start", "")).strip(),
-            plan_end=str(r.get("plan_end", "")).strip(),
-            priority=str(r.get("priority", "")).strip() or "Średni",
-            notes=str(r.get("notes", "") or "").strip(),
-            done=bool(done_val),
-            done_date=str(r.get("done_date", "") or "").strip(),
-        )
-        if t.id:
-            tasks.append(t)
+    rows = ws.get("A2:H")
+    records: List[dict] = []
+    sheet_rows: List[int] = []
+
+    for sheet_row, r in enumerate(rows, start=2):
+        r = [str(v).strip() for v in r] + [""] * (len(SHEET_HEADERS) - len(r))
+        if not r[0]:
+            continue
+
+        records.append({
+            "id": r[0],
+            "name": r[1],
+            "start": r[2],
+            "plan_end": r[3],
+            "priority": r[4] or "Średni",
+            "notes": r[5],
+            "done": r[6].lower() in ["true", "1", "tak", "yes", "y"],
+            "done_date": r[7],
+        })
+        sheet_rows.append(sheet_row)
+
+    return records, sheet_rows, len(records) != len(rows)
+
 
+def load_tasks() -> List[Task]:
+    records, sheet_rows, skipped = _load_tasks_cached()
+    tasks = [Task(**rec) for rec in records]
+    # Po pominiętych wierszach pozycje w arkuszu nie odpowiadają liście zadań,
+    # więc pierwszy zapis przepisze cały arkusz.
+    st.session_state["_sheet_snapshot"] = None if skipped else sheet_snapshot(tasks, sheet_rows)
     return tasks
 
 
+def tasks_to_rows(tasks: List[Task]) -> List[list]:
+    df = tasks_to_df(tasks)
+    if df.empty:
+        return []
+
+    # Daty, których nie udało się sparsować, zapisujemy w oryginalnej postaci.
+    out = pd.DataFrame({
+        "id": df["id"],
+        "name": df["Zadanie"],
+        "start": df["Start"].dt.strftime("%Y-%m-%d").fillna(pd.Series([t.start for t in tasks])),
+        "plan_end": df["Deadline"].dt.strftime("%Y-%m-%d").fillna(pd.Series([t.plan_end for t in tasks])),
+        "priority": df["Priorytet"],
+        "notes": df["Notatki"],
+        "done": np.where(df["Zakończone"].to_numpy(dtype=bool), "TRUE", "FALSE"),
+        "done_date": df["Data zakończenia"].dt.strftime("%Y-%m-%d").fillna(pd.Series([t.done_date for t in tasks])),
+    })
+    return out[SHEET_HEADERS].astype(str).values.tolist()
+
+
+def sheet_snapshot(tasks: List[Task], sheet_rows: Optional[List[int]] = None) -> List[tuple]:
+    # [(numer wiersza w arkuszu, wiersz), ...] w kolejności zadań
+    if sheet_rows is None:
+        sheet_rows = range(2, 2 + len(tasks))
+    return list(zip(sheet_rows, tasks_to_rows(tasks)))
+
+
+def snapshot_is_positional(snapshot: Optional[List[tuple]]) -> bool:
+    # Diff po pozycjach jest bezpieczny tylko, gdy i-ty wiersz leży w wierszu 2+i
+    # arkusza, a id są unikalne.
+    if snapshot is None:
+        return False
+    ids = [row[0] for _, row in snapshot]
+    return (
+        all(sheet_row == 2 + i for i, (sheet_row, _) in enumerate(snapshot))
+        and len(set(ids)) == len(ids)
+    )
+
+
+def sheet_matches_snapshot(ws, snapshot: List[tuple]) -> bool:
+    # Arkusz mógł zostać zmieniony poza aplikacją (usunięte, wstawione lub
+    # posortowane wiersze) — sprawdzamy kolumnę id przed zapisem po pozycjach.
+    sheet_ids = [str(v).strip() for v in ws.col_values(1)[1:]]
+    return sheet_ids == [row[0] for _, row in snapshot]
+
+
 def save_tasks(tasks: List[Task]) -> None:
     ws = get_worksheet()
     ensure_header(ws)
 
-    ws.batch_clear(["A2:Z"])
-    if not tasks:
-        return
+    new_snapshot = sheet_snapshot(tasks)
+    new_rows = [row for _, row in new_snapshot]
+    prev_snapshot = st.session_state.get("_sheet_snapshot")
+    new_ids = [t.id for t in tasks]
+
+    if (
+        not snapshot_is_positional(prev_snapshot)
+        or len(set(new_ids)) != len(new_ids)
+        or not sheet_matches_snapshot(ws, prev_snapshot)
+    ):
+        # Nieznany lub niepewny stan arkusza — przepisujemy całość.
+        ws.batch_clear(["A2:Z"])
+        if new_rows:
+            ws.update("A2", new_rows, value_input_option="RAW")
+    else:
+        # Wiersz i w arkuszu (od 2) odpowiada i-temu zadaniu na liście,
+        # więc wysyłamy tylko wiersze, które zmieniły się na swojej pozycji.
+        prev_rows = [row for _, row in prev_snapshot]
+
+        data = [
+            {"range": f"A{2 + i}", "values": [row]}
+            for i, row in enumerate(new_rows)
+            if i >= len(prev_rows) or prev_rows[i] != row
+        ]
+        if data:
+            ws.batch_update(data, value_input_option="RAW")
 
-    rows = []
-    for t in tasks:
-        rows.append([
-            t.id,
-            t.name,
-            t.start,
-            t.plan_end,
-            t.priority,
-            t.notes,
-            "TRUE" if t.done else "FALSE",
-            t.done_date,
-        ])
+        if len(prev_rows) > len(new_rows):
+            ws.batch_clear([f"A{2 + len(new_rows)}:Z{1 + len(prev_rows)}"])
 
-    ws.update("A2", rows)
+    st.session_state["_sheet_snapshot"] = new_snapshot
+    _load_tasks_cached.clear()
 
 
 def iso(d: date) -> str:
@@ -124,132 +174,51 @@ def validate_dates(start: date, plan_end: date) -> Optional[str]:
     return None
 
 
-def tasks_to_df(tasks: List[Task]) -> pd.DataFrame:
-    if not tasks:
-        return pd.DataFrame(columns=[
-            "id", "Zadanie", "Start", "Deadline", "Priorytet", "Notatki",
-            "Zakończone", "Data zakończenia"
-        ])
-
-    rows = []
-    for t in tasks:
-        rows.append({
-            "id": t.id,
-            "Zadanie": t.name,
-            "Start": t.start,
-            "Deadline": t.plan_end,
-            "Priorytet": t.priority,
-            "Notatki": t.notes,
-            "Zakończone": t.done,
-            "Data zakończenia": t.done_date,
-        })
-
-    df = pd.DataFrame(rows)
-    df["Start"] = pd.to_datetime(df["Start"])
-    df["Deadline"] = pd.to_datetime(df["Deadline"])
-    df["Data zakończenia"] = pd.to_datetime(df["Data zakończenia"], errors="coerce")
-    return df
-
-
-def df_to_tasks(df: pd.DataFrame, prev_tasks: List[Task]) -> List[Task]:
-    prev_by_id = {t.id: t for t in prev_tasks}
-    today = date.today().isoformat()
-
-    new_tasks: List[Task] = []
-    for _, row in df.iterrows():
-        task_id = str(row["id"])
-        prev = prev_by_id.get(task_id)
+def _mutate(new_tasks: List[Task]) -> None:
+    st.session_state.tasks = new_tasks
+    st.session_state.df = tasks_to_df(new_tasks)
+    # Domyślny zakres osi zależy od zadań — po zmianie liczymy go od nowa.
+    st.session_state.pop("gantt_xrange", None)
+    save_tasks(new_tasks)
 
-        name = str(row["Zadanie"]).strip()
-        priority = str(row["Priorytet"])
-        notes = str(row.get("Notatki", "") or "").strip()
-
-        start_dt = pd.to_datetime(row["Start"]).date()
-        deadline_dt = pd.to_datetime(row["Deadline"]).date()
-
-        done_now = bool(row["Zakończone"])
-        done_date_raw = row.get("Data zakończenia", pd.NaT)
-
-        start_iso = start_dt.isoformat()
-        deadline_iso = deadline_dt.isoformat()
-
-        prev_done = prev.done if prev else False
-        prev_done_date = prev.done_date if prev else ""
-
-        if done_now and not prev_done:
-            done_date_iso = today
-        elif (not done_now) and prev_done:
-            done_date_iso = ""
-        else:
-            if pd.isna(done_date_raw):
-                done_date_iso = prev_done_date if prev else ""
-            else:
-                done_date_iso = pd.to_datetime(done_date_raw).date().isoformat()
 
-        new_tasks.append(Task(
-            id=task_id,
-            name=name,
-            start=start_iso,
-            plan_end=deadline_iso,
-            priority=priority,
-            notes=notes,
-            done=done_now,
-            done_date=done_date_iso,
-        ))
-
-    return new_tasks
-
-
-def make_gantt(df: pd.DataFrame, show_done: bool):
-    if df.empty:
-        st.info("Dodaj pierwsze zadanie po lewej — wykres pojawi się tutaj.")
-        return
+@st.fragment
+def render_gantt():
+    c1, c2, c3 = st.columns([1, 1, 2])
+    with c1:
+        show_done = st.checkbox("Pokaż zakończone", value=True)
+    with c2:
+        pri_plot = st.multiselect("Priorytety", PRIORITY_ORDER, default=PRIORITY_ORDER)
+    with c3:
+        text_filter = st.text_input("Filtruj po nazwie", placeholder="np. Budstol / IT / badanie...")
 
-    df = df.copy()
-    if not show_done:
-        df = df[df["Zakończone"] == False]
+    all_tasks = st.session_state.tasks
+    df_plot = st.session_state.df
+
+    xrange = None
+    if not df_plot.empty and st.checkbox("Zawęź zakres dat", key="gantt_xrange_on"):
+        range_start = df_plot["Start"].min()
+        range_end = df_plot[["Deadline", "Data zakończenia"]].max().max()
+        if pd.notna(range_start) and pd.notna(range_end):
+            picked = st.date_input(
+                "Zakres osi czasu",
+                value=(range_start.date(), range_end.date()),
+                key="gantt_xrange",
+            )
+            if isinstance(picked, tuple) and len(picked) == 2:
+                xrange = picked
 
-    if df.empty:
-        st.info("Brak zadań do pokazania przy aktualnym filtrze.")
-        return
-
-    df["Koniec (wykres)"] = df["Deadline"]
-    mask_done = df["Zakończone"] == True
-    df.loc[mask_done, "Koniec (wykres)"] = df.loc[mask_done, "Data zakończenia"].fillna(df.loc[mask_done, "Deadline"])
-
-    df["Sekcja"] = df["Zakończone"].apply(lambda x: "✅ ZAKOŃCZONE" if x else "🟦 AKTYWNE")
-    df["Sekcja_sort"] = pd.Categorical(df["Sekcja"], categories=["🟦 AKTYWNE", "✅ ZAKOŃCZONE"], ordered=True)
-    df["Priorytet_sort"] = pd.Categorical(df["Priorytet"], categories=PRIORITY_ORDER, ordered=True)
-    df = df.sort_values(["Sekcja_sort", "Priorytet_sort", "Start"], ascending=[True, True, True])
-
-    df["Y"] = df["Sekcja"] + "  |  " + df["Zadanie"]
-
-    fig = px.timeline(
-        df,
-        x_start="Start",
-        x_end="Koniec (wykres)",
-        y="Y",
-        color="Priorytet",
-        color_discrete_map=PRIORITY_COLORS,
-        hover_data={
-            "Zadanie": True,
-            "Start": True,
-            "Deadline": True,
-            "Zakończone": True,
-            "Data zakończenia": True,
-            "Notatki": True,
-        },
-    )
+    if not df_plot.empty:
+        mask = df_plot["Priorytet"].isin(pri_plot)
+        needle = text_filter.strip()
+        if needle:
+            mask &= df_plot["Zadanie"].str.contains(needle, case=False, na=False, regex=False)
+        df_plot = df_plot.loc[mask]
 
-    fig.update_yaxes(categoryorder="array", categoryarray=df["Y"].tolist(), autorange="reversed")
-    fig.update_layout(
-        height=max(460, 80 + 32 * len(df)),
-        margin=dict(l=10, r=10, t=30, b=10),
-        legend_title_text="Priorytet",
-        xaxis_title="Czas",
-        yaxis_title="",
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    cache_key = hash((
+        tasks_signature(all_tasks), show_done, tuple(pri_plot), text_filter.strip(), xrange,
+    ))
+    make_gantt(df_plot, show_done=show_done, xrange=xrange, cache_key=cache_key)
 
 
 st.set_page_config(page_title="Moja linia zadań (Gantt)", layout="wide")
@@ -262,6 +231,9 @@ if "tasks" not in st.session_state:
         st.error(f"Nie mogę połączyć się z Google Sheets: {e}")
         st.stop()
 
+if "df" not in st.session_state:
+    st.session_state.df = tasks_to_df(st.session_state.tasks)
+
 left, right = st.columns([1, 2], gap="large")
 
 with left:
@@ -290,8 +262,8 @@ with left:
                 if err:
                     st.error(err)
                 else:
-                    new_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
-                    st.session_state.tasks.append(Task(
+                    new_id = f"{time.time_ns():x}-{secrets.token_hex(3)}"
+                    _mutate(st.session_state.tasks + [Task(
                         id=new_id,
                         name=name.strip(),
                         start=iso(start),
@@ -300,15 +272,14 @@ with left:
                         notes=notes.strip(),
                         done=False,
                         done_date="",
-                    ))
-                    save_tasks(st.session_state.tasks)
+                    )])
                     st.success("Dodano i zapisano do Google Sheets.")
                     st.rerun()
 
     st.divider()
     st.subheader("Edytuj / zakończ (klik w tabeli)")
 
-    df = tasks_to_df(st.session_state.tasks)
+    df = st.session_state.df
 
     if df.empty:
         st.caption("Brak zadań.")
@@ -331,27 +302,10 @@ with left:
             if not bad.empty:
                 st.error("Masz co najmniej jedno zadanie, gdzie Deadline < Start.")
             else:
-                st.session_state.tasks = df_to_tasks(edited, st.session_state.tasks)
-                save_tasks(st.session_state.tasks)
+                _mutate(df_to_tasks(edited, st.session_state.tasks))
                 st.success("Zapisano do Google Sheets.")
                 st.rerun()
 
 with right:
     st.subheader("Oś czasu (Gantt)")
-
-    df_plot = tasks_to_df(st.session_state.tasks)
-
-    c1, c2, c3 = st.columns([1, 1, 2])
-    with c1:
-        show_done = st.checkbox("Pokaż zakończone", value=True)
-    with c2:
-        pri_plot = st.multiselect("Priorytety", PRIORITY_ORDER, default=PRIORITY_ORDER)
-    with c3:
-        text_filter = st.text_input("Filtruj po nazwie", placeholder="np. Budstol / IT / badanie...")
-
-    if not df_plot.empty:
-        df_plot = df_plot[df_plot["Priorytet"].isin(pri_plot)]
-        if text_filter.strip():
-            df_plot = df_plot[df_plot["Zadanie"].str.contains(text_filter.strip(), case=False, na=False)]
-
-    make_gantt(df_plot, show_done=show_done)
+    render_gantt()
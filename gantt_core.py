@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+PRIORITY_COLORS = {
+    "Niski": "#7aa6ff",
+    "Średni": "#f2c14e",
+    "Wysoki": "#ff7a59",
+    "Krytyczny": "#e63946",
+}
+PRIORITY_ORDER = ["Krytyczny", "Wysoki", "Średni", "Niski"]
+
+GANTT_FIG_CACHE_SIZE = 8
+
+
+@dataclass
+class Task:
+    id: str
+    name: str
+    start: str            # ISO YYYY-MM-DD
+    plan_end: str         # ISO YYYY-MM-DD
+    priority: str
+    notes: str = ""
+    done: bool = False
+    done_date: str = ""   # ISO YYYY-MM-DD
+
+
+def tasks_signature(tasks: List[Task]) -> tuple:
+    return tuple(
+        (t.id, t.name, t.start, t.plan_end, t.priority, t.notes, t.done, t.done_date)
+        for t in tasks
+    )
+
+
+def parse_dates(values: list) -> pd.DatetimeIndex:
+    # Szybka ścieżka dla ISO; daty wpisane ręcznie w arkuszu (np. "5.01.2024")
+    # parsujemy osobno, a nierozpoznane zostają jako NaT.
+    values = np.asarray(values, dtype=object)
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce", cache=True)
+    retry = parsed.isna() & (values != "")
+    if retry.any():
+        parsed = parsed.to_numpy(copy=True)
+        parsed[retry] = pd.to_datetime(values[retry], format="mixed", dayfirst=True, errors="coerce")
+        parsed = pd.DatetimeIndex(parsed)
+    return parsed
+
+
+@st.cache_data(show_spinner=False, max_entries=16, hash_funcs={list: tasks_signature})
+def tasks_to_df(tasks: List[Task]) -> pd.DataFrame:
+    if not tasks:
+        return pd.DataFrame(columns=[
+            "id", "Zadanie", "Start", "Deadline", "Priorytet", "Notatki",
+            "Zakończone", "Data zakończenia"
+        ])
+
+    return pd.DataFrame({
+        "id": [t.id for t in tasks],
+        "Zadanie": [t.name for t in tasks],
+        "Start": parse_dates([t.start for t in tasks]),
+        "Deadline": parse_dates([t.plan_end for t in tasks]),
+        "Priorytet": [t.priority for t in tasks],
+        "Notatki": [t.notes for t in tasks],
+        "Zakończone": [t.done for t in tasks],
+        "Data zakończenia": parse_dates([t.done_date for t in tasks]),
+    })
+
+
+def df_to_tasks(df: pd.DataFrame, prev_tasks: List[Task]) -> List[Task]:
+    if df.empty:
+        return []
+
+    today = date.today().isoformat()
+
+    ids = df["id"].astype(str)
+    names = df["Zadanie"].astype(str).str.strip()
+    priorities = df["Priorytet"].astype(str)
+    notes = df["Notatki"].fillna("").astype(str).str.strip()
+
+    # Kolumny dat są już datetime64 (z tasks_to_df), więc ISO powstaje w jednym przebiegu.
+    # Nierozpoznane daty (NaT) zachowują poprzednią wartość z arkusza.
+    start_iso = (
+        df["Start"].dt.strftime("%Y-%m-%d")
+        .fillna(pd.Series({t.id: t.start for t in prev_tasks}, dtype=object).reindex(ids).set_axis(df.index))
+        .fillna("").to_numpy(dtype=object)
+    )
+    deadline_iso = (
+        df["Deadline"].dt.strftime("%Y-%m-%d")
+        .fillna(pd.Series({t.id: t.plan_end for t in prev_tasks}, dtype=object).reindex(ids).set_axis(df.index))
+        .fillna("").to_numpy(dtype=object)
+    )
+    done_date_col = df["Data zakończenia"].dt.strftime("%Y-%m-%d")
+    done_date_missing = done_date_col.isna().to_numpy()
+    done_date_col = done_date_col.to_numpy(dtype=object)
+
+    done_now = df["Zakończone"].fillna(False).astype(bool).to_numpy()
+    # Słownik usuwa powtórzone id, więc reindex nie trafi na zduplikowane etykiety.
+    prev_done = (
+        pd.Series({t.id: t.done for t in prev_tasks}, dtype=object)
+        .reindex(ids).fillna(False).to_numpy(dtype=bool)
+    )
+    prev_done_date = (
+        pd.Series({t.id: t.done_date for t in prev_tasks}, dtype=object)
+        .reindex(ids).fillna("").to_numpy(dtype=object)
+    )
+
+    done_date_iso = np.where(
+        done_now & ~prev_done,
+        today,
+        np.where(
+            ~done_now & prev_done,
+            "",
+            np.where(done_date_missing, prev_done_date, done_date_col),
+        ),
+    )
+
+    return [
+        Task(
+            id=task_id,
+            name=name,
+            start=start,
+            plan_end=plan_end,
+            priority=priority,
+            notes=note,
+            done=done,
+            done_date=done_date,
+        )
+        for task_id, name, start, plan_end, priority, note, done, done_date in zip(
+            ids.tolist(),
+            names.tolist(),
+            start_iso,
+            deadline_iso,
+            priorities.tolist(),
+            notes.tolist(),
+            done_now.tolist(),
+            done_date_iso.tolist(),
+        )
+    ]
+
+
+def make_gantt(
+    df: pd.DataFrame,
+    show_done: bool,
+    xrange: Optional[tuple] = None,
+    cache_key: Optional[int] = None,
+):
+    figs = st.session_state.setdefault("_gantt_figs", OrderedDict())
+    if cache_key is not None and cache_key in figs:
+        figs.move_to_end(cache_key)
+        st.plotly_chart(figs[cache_key], use_container_width=True)
+        return
+
+    if df.empty:
+        st.info("Dodaj pierwsze zadanie po lewej — wykres pojawi się tutaj.")
+        return
+
+    if not show_done:
+        df = df.loc[~df["Zakończone"].to_numpy(dtype=bool)]
+
+    if df.empty:
+        st.info("Brak zadań do pokazania przy aktualnym filtrze.")
+        return
+
+    done = df["Zakończone"].to_numpy(dtype=bool)
+    sekcja = np.where(done, "✅ ZAKOŃCZONE", "🟦 AKTYWNE")
+    df = df.assign(**{
+        "Koniec (wykres)": df["Deadline"].where(~done, df["Data zakończenia"].fillna(df["Deadline"])),
+        "Sekcja": pd.Categorical(sekcja, categories=["🟦 AKTYWNE", "✅ ZAKOŃCZONE"], ordered=True),
+        "Priorytet_sort": pd.Categorical(df["Priorytet"], categories=PRIORITY_ORDER, ordered=True),
+    })
+
+    if xrange is not None:
+        # Rysujemy tylko zadania, które nachodzą na widoczny zakres osi czasu.
+        x0, x1 = pd.Timestamp(xrange[0]), pd.Timestamp(xrange[1])
+        df = df.loc[(df["Start"] <= x1) & (df["Koniec (wykres)"] >= x0)]
+        if df.empty:
+            st.info("Brak zadań w wybranym zakresie dat.")
+            return
+
+    df = df.sort_values(["Sekcja", "Priorytet_sort", "Start"], kind="stable")
+    df["Y"] = df["Sekcja"].astype(str) + "  |  " + df["Zadanie"]
+
+    hover = (
+        "<b>" + df["Zadanie"] + "</b>"
+        + "<br>Start: " + df["Start"].dt.strftime("%Y-%m-%d").fillna("")
+        + "<br>Deadline: " + df["Deadline"].dt.strftime("%Y-%m-%d").fillna("")
+        + "<br>Zakończone: " + np.where(df["Zakończone"].to_numpy(dtype=bool), "tak", "nie")
+        + "<br>Data zakończenia: " + df["Data zakończenia"].dt.strftime("%Y-%m-%d").fillna("")
+        + "<br>Notatki: " + df["Notatki"].fillna("")
+    )
+
+    import plotly.graph_objects as go
+
+    # Każde zadanie to odcinek (start, koniec) w jednym śladzie WebGL na priorytet;
+    # None między odcinkami przerywa linię.
+    fig = go.Figure()
+    for p, part in df.groupby("Priorytet", sort=False):
+        n = len(part)
+        gap = np.full(n, None, dtype=object)
+        x = np.stack([
+            part["Start"].dt.strftime("%Y-%m-%d").to_numpy(dtype=object),
+            part["Koniec (wykres)"].dt.strftime("%Y-%m-%d").to_numpy(dtype=object),
+            gap,
+        ], axis=1).ravel()
+        fig.add_trace(go.Scattergl(
+            x=x,
+            y=np.repeat(part["Y"].to_numpy(dtype=object), 3),
+            mode="lines",
+            line=dict(color=PRIORITY_COLORS.get(p), width=12),
+            name=p,
+            text=np.repeat(hover.loc[part.index].to_numpy(dtype=object), 3),
+            hoverinfo="text",
+        ))
+
+    fig.update_yaxes(categoryorder="array", categoryarray=df["Y"].tolist(), autorange="reversed")
+    fig.update_layout(
+        height=max(460, 80 + 32 * len(df)),
+        margin=dict(l=10, r=10, t=30, b=10),
+        legend_title_text="Priorytet",
+        xaxis_title="Czas",
+        yaxis_title="",
+    )
+    fig.update_xaxes(type="date")
+    if xrange is not None:
+        fig.update_xaxes(range=[x0, x1 + pd.Timedelta(days=1)])
+
+    if cache_key is not None:
+        figs[cache_key] = fig
+        if len(figs) > GANTT_FIG_CACHE_SIZE:
+            figs.popitem(last=False)
+    st.plotly_chart(fig, use_container_width=True)